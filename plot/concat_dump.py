@@ -0,0 +1,33 @@
+import os
+import numpy as np
+
+
+# Python script to concatenate the per-face dump files into one raw
+# binary per field, in (T,6,N,N) float64 order. Run it once after a
+# model run; plot_cs.py memory maps the .bin files when they exist
+# instead of opening thousands of small face files.
+# directory
+datadir  ='../dump/' # must exist
+
+# some constants
+N    = 48 # number of cells
+tc   = 5 # test case
+gtype = 2
+mp = 'c'
+
+timedata = np.loadtxt(datadir+'TC'+str(tc)+"_reftimes.dat").astype(int)
+
+for name in ('h','u','v'):
+   basename = "tc"+str(tc)+"_g"+str(gtype)+'.'+mp+"_N"+str(N)+"_"+name
+   out = np.empty((len(timedata),6,N,N), dtype=np.float64)
+   for t in range(0,len(timedata)):
+      for p in range(0,6):
+         filename = basename+'_t'+str(timedata[t])+"_face"+str(p+1)+'.dat'
+         with open(datadir+filename, 'rb', buffering=0) as f:
+            # tell the kernel the file is streamed once: read ahead
+            # aggressively, then drop the pages after the read
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            f.readinto(out[t,p])
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+   out.tofile(datadir+basename+'.bin')
+   print('wrote ', basename+'.bin')
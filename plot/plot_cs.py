@@ -1,5 +1,7 @@
+import os
 import numpy as np
 import matplotlib.pyplot as plt
+from concurrent.futures import ThreadPoolExecutor
 from plotting_routines  import plot_scalarfield
 
 
@@ -7,8 +9,6 @@ from plotting_routines  import plot_scalarfield
 # directory
 graphdir ='../graphs/' # must exist
 datadir  ='../dump/' # must exist
-nbfaces = 6
-figformat='png'
 
 # some constants
 N    = 48 # number of cells
@@ -42,58 +42,74 @@ colormap='jet'
 
 timedata = np.loadtxt(datadir+'TC'+str(tc)+"_reftimes.dat").astype(int)
 
-#print(basename)
-
 # Get scalar field
-h = np.zeros((N,N,6,len(timedata))) # h at agrid
-u = np.zeros((N,N,6,len(timedata))) # u at agrid
-v = np.zeros((N,N,6,len(timedata))) # v at agrid
-
+# time and face are the leading axes so that each (N,N) face block
+# is contiguous and can be read into directly
+shape = (len(timedata),6,N,N)
+
+# if concat_dump.py has been run, each field is a single (T,6,N,N) binary
+# that can be memory mapped and indexed with zero-copy views; pages are
+# faulted in on demand as the plotting loop consumes them
+# the filename prefix is loop invariant, build it once
+prefix = f"tc{tc}_g{gtype}.{mp}_N{N}_"
+binname = datadir+prefix
+if os.path.exists(binname+'h.bin'):
+   h = np.memmap(binname+'h.bin', dtype=np.float64, mode='r', shape=shape) # h at agrid
+   u = np.memmap(binname+'u.bin', dtype=np.float64, mode='r', shape=shape) # u at agrid
+   v = np.memmap(binname+'v.bin', dtype=np.float64, mode='r', shape=shape) # v at agrid
+   executor = None
+
+else: # fall back to reading the per-face files
+   # the fields are only plotted, so float32 is enough (the colormap
+   # quantizes to 8 bits anyway) and it halves the memory footprint
+   h = np.empty(shape, dtype=np.float32) # h at agrid
+   u = np.empty(shape, dtype=np.float32) # u at agrid
+   v = np.empty(shape, dtype=np.float32) # v at agrid
+
+   field_data = ((h,'h'), (u,'u'), (v,'v'))
+
+   def load_timestep(t):
+      # read the 18 face files (h/u/v x 6 faces) of this timestep back to back;
+      # buffering=0 skips Python's BufferedReader since each file is consumed
+      # in a single readinto
+      z = np.empty((N,N), dtype=np.float64) # per-task scratch, the files are float64
+      for q, name in field_data:
+         for p in range(0,6):
+            filename = f"{prefix}{name}_t{timedata[t]}_face{p+1}.dat"
+            with open(datadir+filename, 'rb', buffering=0) as f:
+               # tell the kernel the file is streamed once: read ahead
+               # aggressively, then drop the pages so large runs do not
+               # thrash the page cache
+               os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+               f.readinto(z)
+               os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+            q[t,p] = z
+
+   # readinto releases the GIL, so the timesteps load in parallel with each
+   # other and with the plotting below; each task fills its own h[t]/u[t]/v[t]
+   executor = ThreadPoolExecutor(max_workers=8)
+   loads = [executor.submit(load_timestep, t) for t in range(0,len(timedata))]
 
 for t in range(0,len(timedata)):
-   for p in range(0,6):
-      
-      # get h
-      basename = "tc"+str(tc)+"_g"+str(gtype)+'.'+mp+"_N"+str(N)+"_h"
-      filename = basename+'_t'+str(timedata[t])+"_face"+str(p+1)+'.dat'
-      z = open(datadir+filename, 'rb')
-      z = np.fromfile(z, dtype=np.float64)
-      z = np.reshape(z, (N,N))
-      h[:,:,p,t] = z
-
-      # get u
-      basename = "tc"+str(tc)+"_g"+str(gtype)+'.'+mp+"_N"+str(N)+"_u"
-      filename = basename+'_t'+str(timedata[t])+"_face"+str(p+1)+'.dat'
-      z = open(datadir+filename, 'rb')
-      z = np.fromfile(z, dtype=np.float64)
-      zz = z
-      z = np.reshape(z, (N,N))
-      u[:,:,p,t] = z
-
-      # get v
-      basename = "tc"+str(tc)+"_g"+str(gtype)+'.'+mp+"_N"+str(N)+"_v"
-      filename = basename+'_t'+str(timedata[t])+"_face"+str(p+1)+'.dat'
-      z = open(datadir+filename, 'rb')
-      z = np.fromfile(z, dtype=np.float64)
-      z = np.reshape(z, (N,N))
-      v[:,:,p,t] = z
+   if executor is not None:
+      loads[t].result()
 
    # plot h graph
-   colormap = 'jet'
    title ="TC"+str(tc)+" - h - time (days) = "+str(timedata[t]/sec2day)
-   output_name =  graphdir+"tc"+str(tc)+"_g"+str(gtype)+'.'+mp+"_N"+str(N)+"_h_t"+str(timedata[t])
-   plot_scalarfield(h[:,:,:,t], map_projection, title, output_name, colormap, hmin, hmax, dpi, figformat, N)
+   output_name =  graphdir+prefix+f"h_t{timedata[t]}"
+   plot_scalarfield(np.moveaxis(h[t], 0, -1), map_projection, title, output_name, colormap, hmin, hmax, dpi, figformat, N)
 
    # plot u graph
-   colormap = 'jet'
    title ="TC"+str(tc)+" - u - time (days) = "+str(timedata[t]/sec2day)
-   output_name =  graphdir+"tc"+str(tc)+"_g"+str(gtype)+'.'+mp+"_N"+str(N)+"_u_t"+str(timedata[t])
-   plot_scalarfield(u[:,:,:,t], map_projection, title, output_name, colormap, umin, umax, dpi, figformat, N)
-   #print(np.amin(u[:,:,:,t]), np.amax(u[:,:,:,t]) )
+   output_name =  graphdir+prefix+f"u_t{timedata[t]}"
+   plot_scalarfield(np.moveaxis(u[t], 0, -1), map_projection, title, output_name, colormap, umin, umax, dpi, figformat, N)
+   #print(np.amin(u[t]), np.amax(u[t]) )
 
    # plot v graph
-   colormap = 'jet'
    title ="TC"+str(tc)+" - v - time (days) = "+str(timedata[t]/sec2day)
-   output_name =  graphdir+"tc"+str(tc)+"_g"+str(gtype)+'.'+mp+"_N"+str(N)+"_v_t"+str(timedata[t])
-   plot_scalarfield(v[:,:,:,t], map_projection, title, output_name, colormap, vmin, vmax, dpi, figformat, N)
-   #print(np.amin(v[:,:,:,t]), np.amax(v[:,:,:,t]) )
+   output_name =  graphdir+prefix+f"v_t{timedata[t]}"
+   plot_scalarfield(np.moveaxis(v[t], 0, -1), map_projection, title, output_name, colormap, vmin, vmax, dpi, figformat, N)
+   #print(np.amin(v[t]), np.amax(v[t]) )
+
+if executor is not None:
+   executor.shutdown()
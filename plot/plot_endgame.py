@@ -1,5 +1,8 @@
+import os
+import multiprocessing
 import numpy as np
 import matplotlib.pyplot as plt
+import cartopy
 import cartopy.crs as ccrs
 import cartopy.feature as cfeature
 from matplotlib import ticker, cm, colors, colorbar
@@ -8,8 +11,6 @@ from matplotlib import ticker, cm, colors, colorbar
 # directory
 graphdir ='../graphs/' # must exist
 datadir  ='../dump/' # must exist
-nbfaces = 6
-figformat='png'
 
 # some constants
 N = 128
@@ -25,18 +26,15 @@ colormap='jet'
 
 timedata = np.loadtxt(datadir+'TC'+str(tc)+"_reftimes.dat").astype(int)
 
-#print(basename)
-
 # Get scalar field
-h = np.zeros((N,M,len(timedata))) # h
-u = np.zeros((N,M,len(timedata))) # u
-v = np.zeros((N,M,len(timedata))) # v
-vort = np.zeros((N,M,len(timedata)))
-pv   = np.zeros((N,M,len(timedata)))
-
-lat = np.linspace(-90,90,M)
-lon = np.linspace(0,360,N)
-lat, lon = np.meshgrid(lat,lon)
+# time is the leading axis so that each (N,M) block is contiguous
+# and can be read into directly; the fields are only plotted, so
+# float32 is enough and halves the memory footprint
+h = np.empty((len(timedata),N,M), dtype=np.float32) # h
+u = np.empty((len(timedata),N,M), dtype=np.float32) # u
+v = np.empty((len(timedata),N,M), dtype=np.float32) # v
+vort = np.empty((len(timedata),N,M), dtype=np.float32)
+pv   = np.empty((len(timedata),N,M), dtype=np.float32)
 
 if tc==5: #flow over a mountain
    hmin, hmax = 5000.0, 6000.0
@@ -55,13 +53,29 @@ elif tc==7: #barotropic instability
 
 fields = [h,u,v,vort,pv]
 field_names = ('h','u','v','pv','vort')
+
+# decode the Natural Earth raster once; ax.stock_img() would re-read and
+# re-warp the image for every figure
+bg_img = plt.imread(os.path.join(cartopy.config["repo_data_dir"],\
+    'raster', 'natural_earth', '50-natural-earth-1-downsampled.png'))
+
+# the filename pieces are loop invariant, build them once
+prefix = f"eg_swe_run_ic{tc}_cor1_"
+res = f"{N}x{M}"
+
+z = np.empty((N,M), dtype=np.float64) # scratch, the files are float64
 for t in range(0,len(timedata)):
    for field, name in zip(fields, field_names):
-      filename = "eg_swe_run_ic"+str(tc)+"_cor1_"+name+"_t"+str(timedata[t])+"_"+str(N)+"x"+str(M)+'.dat'
-      z = open(datadir+filename, 'rb')
-      z = np.fromfile(z, dtype=np.float64)
-      z = np.reshape(z, (N,M))
-      field[:,:,t] = z
+      filename = f"{prefix}{name}_t{timedata[t]}_{res}.dat"
+      # buffering=0 skips Python's BufferedReader since each file is
+      # consumed in a single readinto
+      with open(datadir+filename, 'rb', buffering=0) as f:
+         # tell the kernel the file is streamed once: read ahead
+         # aggressively, then drop the pages after the read
+         os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+         f.readinto(z)
+         os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+      field[t] = z
 
 
 #hmin, hmax = np.amin(fields[0]), np.amax(fields[0])
@@ -72,38 +86,75 @@ for t in range(0,len(timedata)):
 fmins = [hmin, umin, vmin, pvmin, vortmin]
 fmaxs = [hmax, umax, vmax, pvmax, vortmax]
 
-for t in range(0,len(timedata)):
-   for field, name, fmin, fmax in zip(fields, field_names, fmins, fmaxs):
-      # plot the graph
+# resolve the colormap and the per-field normalizations once
+cmap = plt.get_cmap(colormap)
+norms = [colors.Normalize(vmin=fmin, vmax=fmax) for fmin, fmax in zip(fmins, fmaxs)]
+
+def render_steps(tsteps):
+   # create one persistent figure per field, with its basemap, image handle
+   # and colorbar; the time loop then only swaps the image data and title,
+   # avoiding any figure creation or teardown per frame
+   figs = []
+   for field, name, norm in zip(fields, field_names, norms):
       # map projection
       if map_projection == "mercator":
-          plt.figure(figsize=(1832/dpi, 977/dpi), dpi=dpi)
-          plateCr = ccrs.PlateCarree()        
+          fig = plt.figure(figsize=(1832/dpi, 977/dpi), dpi=dpi)
+          plateCr = ccrs.PlateCarree()
       elif map_projection == "sphere":
-          plt.figure(figsize=(800/dpi, 800/dpi), dpi=dpi) 
+          fig = plt.figure(figsize=(800/dpi, 800/dpi), dpi=dpi)
           plateCr = ccrs.Orthographic(central_longitude=0.0, central_latitude=0.0)
           plateCr = ccrs.Orthographic(central_longitude=0.25*180, central_latitude=180/6.0)
 
 
-      projection=ccrs.PlateCarree(central_longitude=0)
-      plateCr._threshold = plateCr._threshold/10. 
-      ax = plt.axes(projection=plateCr)
+      plateCr._threshold = plateCr._threshold/10.
+      ax = fig.add_subplot(projection=plateCr)
       ax.set_global()
-      ax.stock_img()
+      ax.imshow(bg_img, origin='upper', extent=[-180,180,-90,90], transform=ccrs.PlateCarree())
       ax.gridlines(draw_labels=True)
 
-      im=plt.contourf(lon, lat, field[:,:,t], cmap='jet',  transform=ccrs.PlateCarree(), levels=np.linspace(fmin,fmax,100))
-      title ="TC"+str(tc)+" - "+name+" - time (days) = "+str(timedata[t]/sec2day)+" - "+str(N)+"x"+str(M) 
-      plt.title(title)
+      # the grid is regular lat/lon, so a raster rendering is equivalent to
+      # contourf with dense levels and skips the contour triangulation;
+      # roll the data by 180 degrees so the extent stays inside the
+      # PlateCarree [-180,180] bounds and cartopy takes the
+      # same-projection fast path instead of regridding the image
+      im=ax.imshow(np.roll(field[0].T, M, axis=1), origin='lower', extent=[-180,180,-90,90],\
+          norm=norm, cmap=cmap, transform=ccrs.PlateCarree(), interpolation='nearest')
 
       # Plot colorbar
       cax,kw = colorbar.make_axes(ax,orientation='vertical' , fraction=0.046, pad=0.04, shrink=0.8, format='%.1e')
-      cb=plt.colorbar(im, cax=cax, extend='both',**kw)
+      cb=fig.colorbar(im, cax=cax, extend='both',**kw)
       cb.ax.tick_params(labelsize=8)
-      filename = "eg_swe_run_ic"+str(tc)+"_cor1_"+name+"_t"+str(timedata[t])+"_"+str(N)+"x"+str(M)
-      plt.savefig(graphdir+filename+'.'+figformat, format=figformat)
-      print('plotted ', filename)
-      #plt.show()
-      plt.close()
+      figs.append((fig, ax, im))
+
+   for t in tsteps:
+      for (fig, ax, im), field, name in zip(figs, fields, field_names):
+         # plot the graph
+         # same 180-degree roll as the initial imshow, so the data stays
+         # consistent with the [-180,180] extent stored in the image
+         im.set_array(np.roll(field[t].T, M, axis=1))
+         title ="TC"+str(tc)+" - "+name+" - time (days) = "+str(timedata[t]/sec2day)+" - "+res
+         ax.set_title(title)
+         filename = f"{prefix}{name}_t{timedata[t]}_{res}"
+         # low zlib compression level: the PNG encode is CPU bound at the
+         # default level and these frames are not kept long term
+         fig.savefig(graphdir+filename+'.'+figformat, format=figformat,\
+             pil_kwargs={'compress_level': 1, 'optimize': False})
+         print('plotted ', filename)
+         #plt.show()
+
+   for fig, ax, im in figs:
+      plt.close(fig)
+
+# the frames are independent, so split the timesteps across one worker
+# per core; the workers are forked after the fields are loaded and
+# inherit the arrays, so only the timestep index lists are pickled
+# (fork is requested explicitly: the default start method would
+# re-import this script in each worker)
+nproc = min(os.cpu_count(), len(timedata))
+if nproc > 1:
+   with multiprocessing.get_context('fork').Pool(processes=nproc) as pool:
+      pool.map(render_steps, [list(range(i,len(timedata),nproc)) for i in range(0,nproc)])
+else:
+   render_steps(range(0,len(timedata)))
 
 exit()
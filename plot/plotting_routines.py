@@ -12,6 +12,23 @@ griddir ='../dump/' # must exist
 nbfaces = 6
 rad2deg = 180/np.pi
 
+# grid coordinates per N, loaded once and reused by every plot call
+grid_cache = {}
+
+#----------------------------------------------------------------------------------------------
+# Load the cubed-sphere vertex coordinates (degrees) as (N+1,N+1,6) arrays.
+#----------------------------------------------------------------------------------------------
+def load_grid(N):
+    if N not in grid_cache:
+        # memory map the per-face files and stack the views; the reads
+        # happen lazily as the plotting consumes the pages
+        lons = [np.memmap(griddir+'g2_N'+str(N)+'_face'+str(p+1)+'_lon.dat',\
+            dtype=np.float64, mode='r', shape=(N+1,N+1)) for p in range(0, nbfaces)]
+        lats = [np.memmap(griddir+'g2_N'+str(N)+'_face'+str(p+1)+'_lat.dat',\
+            dtype=np.float64, mode='r', shape=(N+1,N+1)) for p in range(0, nbfaces)]
+        grid_cache[N] = (np.stack(lons, axis=-1)*rad2deg, np.stack(lats, axis=-1)*rad2deg)
+    return grid_cache[N]
+
 #----------------------------------------------------------------------------------------------
 # Plot the scalar field q given in a A grid.
 #----------------------------------------------------------------------------------------------
@@ -20,22 +37,7 @@ def plot_scalarfield(q, map_projection, title, filename, colormap, qmin, qmax,\
 
     #Get grid info
     #N = np.shape(q)[0]
-    lons = np.zeros((N+1,N+1,6))
-    lats = np.zeros((N+1,N+1,6))
-
-    for p in range(0, nbfaces):
-        input_grid_bin_lon  = griddir+'g2_N'+str(N)+'_face'+str(p+1)+'_lon.dat'    
-        input_grid_bin_lat  = griddir+'g2_N'+str(N)+'_face'+str(p+1)+'_lat.dat'
-
-        x = open(input_grid_bin_lon, 'rb')
-        x = np.fromfile(x, dtype=np.float64)
-        x = np.reshape(x, (N+1,N+1))*rad2deg
-
-        y = open(input_grid_bin_lat, 'rb')
-        y = np.fromfile(y, dtype=np.float64)
-        y = np.reshape(y, (N+1,N+1))*rad2deg
-        lons[:,:,p] = x
-        lats[:,:,p] = y
+    lons, lats = load_grid(N)
 
     # map projection
     if map_projection == "mercator":
@@ -47,7 +49,6 @@ def plot_scalarfield(q, map_projection, title, filename, colormap, qmin, qmax,\
         plateCr = ccrs.Orthographic(central_longitude=0.25*180, central_latitude=180/6.0)
 
 
-    projection=ccrs.PlateCarree(central_longitude=0)
     plateCr._threshold = plateCr._threshold/10.
 
     ax = plt.axes(projection=plateCr)
@@ -55,6 +56,10 @@ def plot_scalarfield(q, map_projection, title, filename, colormap, qmin, qmax,\
     ax.stock_img()
     ax.gridlines(draw_labels=True)
 
+    # resolve the colormap and normalization once, not per face
+    cmap = plt.get_cmap(colormap)
+    norm = plt.Normalize(vmin=qmin, vmax=qmax)
+
     # Color of each cubed panel
     colors = ('black','black','black','black','black','black')
     colors = ('gray','gray','gray','gray','gray','gray')
@@ -79,13 +84,16 @@ def plot_scalarfield(q, map_projection, title, filename, colormap, qmin, qmax,\
 
         # Plot scalar field
         im = ax.pcolormesh(lon, lat, q[:,:,p], alpha=1, transform=ccrs.PlateCarree(), \
-        zorder=10, vmin = qmin, vmax=qmax,  cmap=colormap)
+        zorder=10, norm=norm, cmap=cmap)
     plt.title(title)
 
     # Plot colorbar
     cax,kw = colorbar.make_axes(ax,orientation='vertical' , fraction=0.046, pad=0.04, shrink=0.8, format='%.1e')
     cb=plt.colorbar(im, cax=cax, extend='both',**kw)
     cb.ax.tick_params(labelsize=8)
-    plt.savefig(filename+'.'+figformat, format=figformat)
+    # low zlib compression level: the PNG encode is CPU bound at the
+    # default level and these frames are not kept long term
+    plt.savefig(filename+'.'+figformat, format=figformat,\
+        pil_kwargs={'compress_level': 1, 'optimize': False})
     print('plotted ', filename)
     plt.close()